@@ -0,0 +1,94 @@
+import os
+import sys
+import subprocess
+from pathlib import Path
+
+# =========================================================================
+# PRESUPUESTO DE TIEMPO DE ARRANQUE
+# Mide el tiempo de importación del punto de entrada con `python -X importtime`
+# y falla si supera el presupuesto o si se importa alguna dependencia pesada que
+# debería cargarse de forma diferida.
+#
+#   python benchmarks/startup_time.py
+# =========================================================================
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+ENTRY_MODULE = "get_issue_attachments"
+STARTUP_BUDGET_MS = float(os.getenv('STARTUP_BUDGET_MS', '350'))
+STARTUP_RUNS = int(os.getenv('STARTUP_RUNS', '5'))
+
+# Dependencias que solo deben cargarse cuando el lector o la etapa que las usa se ejecuta
+LAZY_MODULES = ["requests", "pypdf", "docx", "openpyxl", "pandas", "xlsxwriter", "openai"]
+
+
+def measure_import() -> tuple[float, dict[str, int], set[str]]:
+    """
+    Importa el punto de entrada en un proceso nuevo con -X importtime.
+    :return: El tiempo total en ms (suma de los tiempos 'self'), el tiempo acumulado de cada módulo
+             importado directamente por el punto de entrada (us) y el conjunto de todos los módulos importados.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {ENTRY_MODULE}"],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        # Mostramos solo el error (sin las líneas de -X importtime)
+        error = "\n".join(line for line in result.stderr.splitlines() if not line.startswith("import time:"))
+        print(f"ERROR: No se pudo importar '{ENTRY_MODULE}':\n{result.stdout}{error}")
+        sys.exit(2)
+
+    total_us = 0
+    direct = {}
+    children = {}
+    imported = set()
+    # Formato: "import time:      self [us] |  cumulative | imported package"
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        self_us, cumulative_us, package = line[len("import time:"):].split("|")
+        total_us += int(self_us)
+        imported.add(package.strip())
+        # La sangría de la columna del nombre indica la profundidad (2 espacios por nivel).
+        # Profundidad 1 = importado directamente por el punto de entrada.
+        # Los hijos se listan antes que su padre: acumulamos los de profundidad 1 hasta ver su padre.
+        depth = (len(package) - len(package.lstrip()) - 1) // 2
+        if depth == 1:
+            children[package.strip()] = int(cumulative_us)
+        elif depth == 0:
+            if package.strip() == ENTRY_MODULE:
+                direct = children
+            children = {}
+
+    return total_us / 1000, direct, imported
+
+
+def main():
+    # Nos quedamos con la mejor de varias ejecuciones para reducir el ruido del runner
+    runs = [measure_import() for _ in range(STARTUP_RUNS)]
+    best_ms, direct, imported = min(runs, key=lambda run: run[0])
+
+    print(f"Tiempo de importación de '{ENTRY_MODULE}': {best_ms:.1f} ms (presupuesto: {STARTUP_BUDGET_MS:.0f} ms)")
+    print("Importaciones directas más costosas:")
+    for package, cumulative_us in sorted(direct.items(), key=lambda item: item[1], reverse=True)[:10]:
+        print(f"   {cumulative_us / 1000:8.1f} ms  {package}")
+
+    failed = False
+
+    eager = [name for name in LAZY_MODULES if name in imported]
+    if eager:
+        print(f"FALLO: Se importan al arrancar dependencias que deberían ser diferidas: {', '.join(eager)}")
+        failed = True
+
+    if best_ms > STARTUP_BUDGET_MS:
+        print(f"FALLO: El arranque supera el presupuesto por {best_ms - STARTUP_BUDGET_MS:.1f} ms")
+        failed = True
+
+    if failed:
+        sys.exit(1)
+    print("OK: El arranque está dentro del presupuesto.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import os
+import csv
+from ifactory.interface import ReadingInterface
+from pathlib import Path
+
+# Máximo de filas que se incluyen en el texto (mismo límite que READXLS)
+SPREADSHEET_MAX_ROWS = int(os.getenv('SPREADSHEET_MAX_ROWS', '2000'))
+# Codificaciones a probar en orden: utf-8-sig descarta el BOM que agrega Excel; cp1252 es la
+# de Excel en Windows con configuración regional en español; latin-1 acepta cualquier byte.
+CSV_ENCODINGS = ("utf-8-sig", "cp1252", "latin-1")
+
+class ReadCSV(ReadingInterface):
+    def get_reading(self, file: str) -> str:
+        """
+        Lee un archivo CSV fila por fila (en streaming), detectando el delimitador y la codificación.
+        :param file: la ruta (string) al archivo CSV.
+        :return: Un string con una línea por fila, celdas separadas por " | ".
+        """
+        csv_path = Path(file)
+
+        # 1. Validacion de Ruta
+        if not csv_path.is_file():
+            return f"Error: El archivo no fue encontrado en la ruta {file}"
+
+        try:
+            # 2. Lectura del Contenido
+            # Si la codificación no es la correcta, se reintenta con la siguiente
+            for encoding in CSV_ENCODINGS:
+                try:
+                    return self._read_rows(csv_path, encoding)
+                except UnicodeDecodeError:
+                    continue
+
+        except Exception as e:
+            # 3. Manejo de Errores (permisos u otros problemas)
+            return f"Error al leer el archivo CSV {file}: {e}"
+
+    @staticmethod
+    def _read_rows(csv_path: Path, encoding: str) -> str:
+        with open(csv_path, 'r', encoding=encoding, newline='') as f:
+            # Detectamos el delimitador (coma, punto y coma, tabulador...) con una muestra
+            try:
+                dialect = csv.Sniffer().sniff(f.read(8192), delimiters=",;\t|")
+            except csv.Error:
+                dialect = csv.excel
+            f.seek(0)
+
+            text = []
+            for row in csv.reader(f, dialect):
+                # Las celdas vacías intermedias se conservan para no desalinear las columnas;
+                # solo se quitan las vacías del final
+                cells = [cell.strip() for cell in row]
+                while cells and not cells[-1]:
+                    cells.pop()
+                if not cells:
+                    continue
+
+                if len(text) >= SPREADSHEET_MAX_ROWS:
+                    text.append(f"[... archivo recortado a {SPREADSHEET_MAX_ROWS} filas ...]")
+                    break
+
+                text.append(" | ".join(cells))
+
+        return "\n".join(text)
@@ -1,11 +1,39 @@
+import os
+import multiprocessing
 from ifactory.interface import ReadingInterface
 from pypdf import PdfReader
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+# A partir de cuántas páginas se reparte la extracción entre varios procesos
+PDF_PARALLEL_MIN_PAGES = int(os.getenv('PDF_PARALLEL_MIN_PAGES', '60'))
+# Número máximo de procesos para la extracción en paralelo (por defecto, los núcleos disponibles)
+PDF_PARALLEL_WORKERS = int(os.getenv('PDF_PARALLEL_WORKERS', str(os.cpu_count() or 1)))
+
+
+# Lector del PDF dentro de cada proceso del pool (lo abre _init_worker una sola vez por proceso)
+_worker_reader: PdfReader | None = None
+
+
+def _init_worker(file: str):
+    global _worker_reader
+    _worker_reader = PdfReader(file)
+
+
+def _extract_page_range(start: int, end: int) -> list[str]:
+    """
+    Extrae el texto de las páginas [start, end) del PDF abierto por _init_worker.
+    Se ejecuta en un proceso del pool.
+    """
+    return [_worker_reader.pages[i].extract_text(extraction_mode="layout") for i in range(start, end)]
+
 
 class ReadPDF(ReadingInterface):
     def get_reading(self, file: str) -> str:
         """
         Lee el contenido de texto de todas las páginas de un archivo PDF.
+        Si el PDF supera PDF_PARALLEL_MIN_PAGES páginas, el rango de páginas se divide en
+        bloques que se extraen en procesos separados y se vuelven a unir en orden.
         :param file: la ruta (string) al archivo PDF.
         :return: Un string que contiene el texto concatenado de todas las páginas.
         """
@@ -15,19 +43,41 @@ class ReadPDF(ReadingInterface):
         # verificar se el archivo existe (parche)
         if not pdf_path.is_file():
             return f"Error: El archivo no fue encontrado en la ruta {file}"
-        
+
         try:
             # Crear un objeto PdfReader
             reader = PdfReader(pdf_path)
-            text = ""
+            total_pages = len(reader.pages)
+            workers = min(PDF_PARALLEL_WORKERS, total_pages)
+
+            if total_pages < PDF_PARALLEL_MIN_PAGES or workers < 2:
+                # Iterar sobre todas las páginas y extraer el texto de cada una
+                pages = [page.extract_text(extraction_mode="layout") for page in reader.pages]
+            else:
+                pages = self._get_reading_parallel(str(pdf_path), total_pages, workers)
 
-            # Iterar sobre todas las páginas
-            for page in reader.pages:
-                # Extraer el texto de la página y concatenarlo
-                text += page.extract_text(extraction_mode="layout") + "\n" # Salto de linea para juntarlo todo
+            # Salto de linea para juntarlo todo; el salto de página (\f) permite
+            # detectar después los encabezados/pies repetidos (services/compact_text.py)
+            return "\f".join(page + "\n" for page in pages)
 
-                return text
-            
         except Exception as e:
             # Manejo de errores durante la lectura (ej. archivo corrupto, permisos)
-            return f"Error al leer el archivo PDF {file}: {e}"
\ No newline at end of file
+            return f"Error al leer el archivo PDF {file}: {e}"
+
+    @staticmethod
+    def _get_reading_parallel(file: str, total_pages: int, workers: int) -> list[str]:
+        # Bloques contiguos de páginas; más bloques que procesos para repartir mejor la carga
+        shards = workers * 4
+        size = -(-total_pages // shards) # división redondeando hacia arriba
+        ranges = [(start, min(start + size, total_pages)) for start in range(0, total_pages, size)]
+
+        print(f"--- PDF de {total_pages} páginas: extracción en {len(ranges)} bloques con {workers} procesos ---")
+
+        # Cada proceso abre el PDF una sola vez (initializer), no una vez por bloque.
+        # "spawn" en lugar de fork: get_reading se llama desde asyncio.to_thread y hacer fork
+        # de un proceso con varios hilos puede heredar locks tomados y colgar al hijo.
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(file,)) as executor:
+            # executor.map conserva el orden de los bloques, así el texto queda en orden de página
+            results = executor.map(_extract_page_range, *zip(*ranges))
+            return [text for shard in results for text in shard]
@@ -0,0 +1,57 @@
+import os
+from ifactory.interface import ReadingInterface
+from pathlib import Path
+from openpyxl import load_workbook
+
+# Máximo de filas por hoja que se incluyen en el texto (la memoria se mantiene constante)
+SPREADSHEET_MAX_ROWS = int(os.getenv('SPREADSHEET_MAX_ROWS', '2000'))
+
+class READXLS(ReadingInterface):
+    def get_reading(self, file: str) -> str:
+        """
+        Lee el contenido de todas las hojas de un archivo XLSX fila por fila.
+        Usa el modo read_only de openpyxl, que recorre el archivo en streaming sin cargarlo entero en memoria.
+        :param file: la ruta (string) al archivo XLSX.
+        :return: Un string con el texto de cada hoja (una línea por fila, celdas separadas por " | ").
+        """
+        xlsx_path = Path(file)
+
+        # 1. Validacion de Ruta
+        if not xlsx_path.is_file():
+            return f"Error: El archivo no fue encontrado en la ruta {file}"
+
+        try:
+            # 2. Lectura del Contenido
+            # read_only=True: streaming de filas; data_only=True: valores calculados en lugar de fórmulas
+            workbook = load_workbook(xlsx_path, read_only=True, data_only=True)
+            text = []
+
+            try:
+                for sheet in workbook.worksheets:
+                    text.append(f"=== Hoja: {sheet.title} ===")
+                    rows = 0
+
+                    for row in sheet.iter_rows(values_only=True):
+                        # Las celdas vacías intermedias se conservan para no desalinear las columnas;
+                        # solo se quitan las vacías del final (y se omiten las filas vacías)
+                        cells = ["" if value is None else str(value).strip() for value in row]
+                        while cells and not cells[-1]:
+                            cells.pop()
+                        if not cells:
+                            continue
+
+                        if rows >= SPREADSHEET_MAX_ROWS:
+                            text.append(f"[... hoja recortada a {SPREADSHEET_MAX_ROWS} filas ...]")
+                            break
+
+                        text.append(" | ".join(cells))
+                        rows += 1
+            finally:
+                # En modo read_only el archivo queda abierto hasta cerrar el libro
+                workbook.close()
+
+            return "\n".join(text)
+
+        except Exception as e:
+            # 3. Manejo de Errores (archivo corrupto, no es un XLSX válido, permisos)
+            return f"Error al leer el archivo XLSX {file}: {e}"
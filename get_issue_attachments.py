@@ -3,8 +3,7 @@ import sys
 import asyncio
 from pathlib import Path
 from urllib import response
-import httpx # Reemplazo moderno y asíncrono de 'requests'
-from requests.auth import HTTPBasicAuth # Se mantiene para la autenticación básica
+import httpx # Reemplazo moderno y asíncrono de 'requests' (se necesita siempre: consulta de adjuntos)
 import base64
 
 # =========================================================================
@@ -12,6 +11,9 @@ import base64
 # (Asumimos que estos servicios son síncronos o no pueden ser fácilmente refactorizados a async)
 # =========================================================================
 try:
+    # Estos módulos son livianos: las dependencias pesadas (pypdf, python-docx, openpyxl,
+    # pandas, openai) se importan dentro de la función que las usa, así una
+    # ejecución que termina sin adjuntos no paga su tiempo de importación.
     # Nota: Si ProcessDOC, send_chat, createxlsx, y upload_attachment_to_jira
     # tienen llamadas a API o I/O internas que son lentas, 
     # se beneficiarían de ser refactorizadas a async/await internamente.
@@ -21,6 +23,10 @@ try:
 #    from services.iachat import send_chat
 #    from services.formatxlsx import createxlsx
     from services.upload_attachment_to_jira import upload_attachment_to_jira
+    from services.bundle_upload import upload_issue_bundle, is_bundle_name
+    from services.jira_watch import WatchState, AdaptiveInterval, build_watch_jql, initial_cursor
+    from services.resumable_download import download_resumable
+    from services.job_queue import JobQueue
 except ImportError as e:
     print(f"ERROR CRÍTICO de importación: {e}. Verifique la estructura de carpetas de 'services'.")
     sys.exit(1)
@@ -32,12 +38,23 @@ JIRA_USER = os.getenv('USER_JIRA')
 JIRA_TOKEN = os.getenv('JIRA_TOKEN')
 ISSUE_KEY = os.getenv('ISSUE_KEY')
 TARGET_DIR = os.getenv('TARGET_DIR')
-ATTACHMENT_ENDPOINT = f"{JIRA_URL}/rest/api/3/issue/{ISSUE_KEY}?fields=attachment"
 # Token Xray
 XRAY_ID = os.getenv('XRAY_ID')
 XRAY_PASSWORD = os.getenv('XRAY_CLIENT')
 XRAY_AUTH = os.getenv('XRAY_URL_AUTH')
 XRAY_GRAPHQL = os.getenv('XRAY_URL_GRAPHQL')
+# Modo watch (polling sin webhooks)
+WATCH_JQL = os.getenv('WATCH_JQL')
+WATCH_STATE_FILE = Path(os.getenv('WATCH_STATE_FILE', 'CP/.watch_state.json'))
+WATCH_SINCE = os.getenv('WATCH_SINCE') # Desde cuándo revisar en la primera ejecución (por defecto: ahora)
+WATCH_MIN_INTERVAL = float(os.getenv('WATCH_MIN_INTERVAL', '30'))
+WATCH_MAX_INTERVAL = float(os.getenv('WATCH_MAX_INTERVAL', '600'))
+WATCH_MAX_FAILURES = int(os.getenv('WATCH_MAX_FAILURES', '3')) # Fallos seguidos del pipeline antes de descartar los adjuntos
+# Marca que deja el pipeline en TARGET_DIR antes de crear subtareas (el watch no lo repite si existe)
+SUBTASKS_MARKER = ".subtareas_creadas"
+# Modo cola de trabajos (job_worker.py)
+JOB_QUEUE_DB = os.getenv('JOB_QUEUE_DB')
+JOB_LEASE_TOKEN = os.getenv('JOB_LEASE_TOKEN')
 
 
 # Lista global para almacenar los metadatos de los adjuntos de Jira (payload)
@@ -84,25 +101,72 @@ def crear_subtarea_jira(parent_key, titulo):
         print(f"   [Jira] Error de conexión: {e}")
         return None
 
+def holds_job_lease() -> bool:
+    """
+    En modo cola (job_worker.py) comprueba que este proceso sigue siendo el dueño del lease
+    de la incidencia. Fuera del modo cola siempre retorna True.
+    """
+    if not (JOB_QUEUE_DB and JOB_LEASE_TOKEN):
+        return True
+
+    queue = JobQueue(JOB_QUEUE_DB)
+    try:
+        return queue.holds_lease(ISSUE_KEY, JOB_LEASE_TOKEN)
+    finally:
+        queue.close()
+
+def is_hu_file(filename: str) -> bool:
+    """Filtro de HU: el nombre contiene 'hu' y no es un bundle ZIP generado por este proceso."""
+    return 'hu' in filename.lower() and not is_bundle_name(filename)
+
 # --- FUNCIONES ASÍNCRONAS ---
 
-async def fetch_jira_attachments_metadata(client: httpx.AsyncClient) -> list:
-    """Conecta a la API de Jira y obtiene los metadatos de los adjuntos."""
+async def fetch_jira_attachments_metadata(client: httpx.AsyncClient, issue_key: str | None = None, validators: dict | None = None) -> list | None:
+    """
+    Conecta a la API de Jira y obtiene los metadatos de los adjuntos.
+
+    :param issue_key: Incidencia a consultar (por defecto ISSUE_KEY). En modo watch los errores se propagan en lugar de terminar el script.
+    :param validators: Dict con 'etag' / 'last_modified' de la consulta anterior. Si se pasa, la petición es condicional
+                       y se actualiza con los nuevos valores.
+    :return: La lista de adjuntos, o None si Jira respondió 304 (la incidencia no cambió).
+    """
     global attachments # Para mantener la compatibilidad con la función de correo
 
-    if not all([JIRA_URL, JIRA_USER, JIRA_TOKEN, ISSUE_KEY, TARGET_DIR]):
+    watch_mode = issue_key is not None
+    issue_key = issue_key or ISSUE_KEY
+
+    if not all([JIRA_URL, JIRA_USER, JIRA_TOKEN, issue_key]) or (not watch_mode and not TARGET_DIR):
         print("ERROR CRÍTICO: Faltan credenciales o la ruta dinámica (TARGET_DIR) no se exportó.")
         sys.exit(1)
         
-    print(f"1. Buscando adjuntos para: {ISSUE_KEY}")
+    print(f"1. Buscando adjuntos para: {issue_key}")
+
+    # Cabeceras condicionales: si el servidor las soporta, responde 304 sin cuerpo
+    headers = {}
+    if validators:
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
     
     try:
-        response = await client.get(ATTACHMENT_ENDPOINT, timeout=30.0)
+        endpoint = f"{JIRA_URL}/rest/api/3/issue/{issue_key}?fields=attachment"
+        response = await client.get(endpoint, headers=headers, timeout=30.0)
+        if response.status_code == 304:
+            print(f"   -> {issue_key} sin cambios (304).")
+            return None
         response.raise_for_status() 
+
+        if validators is not None:
+            validators['etag'] = response.headers.get('ETag')
+            validators['last_modified'] = response.headers.get('Last-Modified')
+
         issue_data = response.json()
         attachments = issue_data.get('fields', {}).get('attachment', []) # Asignamos al global
         return attachments
     except httpx.RequestError as e:
+        if watch_mode:
+            raise
         print(f"ERROR al conectar con la API de Jira: {e}")
         sys.exit(1)
 
@@ -112,33 +176,22 @@ async def download_single_attachment(client: httpx.AsyncClient, attachment: dict
     filepath = Path(target_dir) / filename
 
     # --- FILTRO DE ARCHIVOS ---
-    if "hu" not in filename.lower():
+    if not is_hu_file(filename):
         print(f"   -> Omitiendo '{filename}': No contiene el prefijo 'hu'.")
         return False
     # ---------------------------
     
     print(f"   -> Iniciando descarga: {filename}")
     
-    try:
-        # [MODIFICACIÓN CLAVE]: Usamos client.get() en lugar de client.stream().
-        # Esto permite que httpx gestione automáticamente la redirección 303,
-        # y la respuesta final (file_response) será la que contenga el archivo real (código 200).
-        file_response = await client.get(content_url, follow_redirects=True, timeout=None)
-        
-        # Ahora, raise_for_status() se ejecuta en la respuesta 200 OK final, o falla solo si es 4xx/5xx.
-        file_response.raise_for_status()
-        
-        # [MODIFICACIÓN CLAVE]: Guardamos todo el contenido de una vez (file_response.content).
-        filepath.parent.mkdir(parents=True, exist_ok=True)
-        with open(filepath, 'wb') as f:
-            f.write(file_response.content)
-            
-        print(f"   -> Guardado OK: {filepath.name}")
+    # Descarga en streaming hacia un archivo parcial (.partial/<nombre>.part). Si falla a mitad,
+    # los reintentos (en esta ejecución o en la siguiente) piden solo los bytes que faltan con Range.
+    # httpx sigue la redirección 303 de Jira hacia la URL de media, que se guarda en el sidecar.
+    if await download_resumable(client, content_url, filepath, expected_size=attachment.get('size')):
+        print(f"   -> Guardado OK: {filepath.name}")
         return True
-        
-    except httpx.RequestError as e:
-        print(f"ERROR al descargar '{filename}': {e}")
-        return False
+
+    print(f"ERROR al descargar '{filename}': se agotaron los reintentos. El progreso parcial se conserva.")
+    return False
 
 def generate_folder_structure(base_path: Path, filename: str) -> Path:
     """
@@ -171,7 +224,7 @@ async def process_single_file(filepath: Path) -> str | None:
     3. Crea las subtareas en Jira de forma asíncrona.
     """
     # 1. Filtro de seguridad por nombre
-   if 'hu' not in filepath.name.lower():
+   if not is_hu_file(filepath.name):
         return None
     
    hu_name = filepath.stem
@@ -206,7 +259,15 @@ Estado: Pendiente de Revisión
         
         print(f"   -> [Sistema] Documento creado en: {test_plan_path.parent.name}/{test_plan_filename}")
         
+        # Con la cola de trabajos, solo el dueño vigente del lease crea subtareas
+        if not await asyncio.to_thread(holds_job_lease):
+            print(f"   [Cola] Lease perdido para {ISSUE_KEY}: otro worker la procesa. No se crean subtareas.")
+            return None
+
         # 3. CREACIÓN DE SUBTAREAS EN JIRA
+        # La marca se escribe antes de la primera subtarea: si el proceso falla a mitad,
+        # el modo watch sabe que repetirlo duplicaría subtareas
+        (Path(TARGET_DIR) / SUBTASKS_MARKER).touch()
         print(f"   -> Creando subtareas en Jira para {ISSUE_KEY}...")
         subtareas = ["Estrategia de Pruebas", "Analisis y diseño de pruebas", "Ejecucion de pruebas"]
         for titulo in subtareas:
@@ -236,7 +297,7 @@ async def main():
 
     # 2. CONFIGURACIÓN DE CONEXIÓN JIRA
     # Preparamos la autenticación básica (Usuario + Token) para JIRA
-    auth = HTTPBasicAuth(JIRA_USER, JIRA_TOKEN) # permite alamcenar las credenciales de jira
+    auth = (JIRA_USER, JIRA_TOKEN) # permite alamcenar las credenciales de jira (httpx las envía como Basic Auth)
     
     # Iniciamos el cliente HTTP asíncrono (httpx)
     # Usamos 'async with' para segurar que la conexion se cierre correctamente al terminar
@@ -282,7 +343,7 @@ async def main():
         # --- FASE 3: PROCESAMIENTO (CREACIÓN DE CARPETAS) ---
         target_path = Path(TARGET_DIR)
         print("\n4. Creando estructuras de carpetas y subtareas...")
-        files_to_process = [p for p in target_path.iterdir() if p.is_file() and 'hu' in p.name.lower()]
+        files_to_process = [p for p in target_path.iterdir() if p.is_file() and is_hu_file(p.name)]
         
         if files_to_process:
             processed_results = await asyncio.gather(*(process_single_file(f) for f in files_to_process))
@@ -299,7 +360,7 @@ async def main():
         # Añadimos nombres de archivos originales descargados
         for attachment in attachments_metadata:
             fname = attachment.get('filename', '')
-            if 'hu' in fname.lower():
+            if is_hu_file(fname):
                 archivos_finales.append(fname)
 
         """
@@ -308,6 +369,15 @@ async def main():
         La lista attachments contiene toda la información cruda que bajamos de Jira al principio (nombre, tamaño, link de descarga, autor, etc.).
         """
 
+        # Subimos la carpeta de la incidencia como un único ZIP (solo si su contenido cambió)
+        if archivos_generados:
+            print("\n4b. Empaquetando y subiendo la carpeta de la incidencia a Jira...")
+            bundle_name = await asyncio.to_thread(
+                upload_issue_bundle, target_path, current_issue_key, JIRA_URL, JIRA_USER, JIRA_TOKEN
+            )
+            if bundle_name:
+                archivos_finales.append(bundle_name)
+
         # Eliminar duplicados por seguridad (convertir a set y luego a list)
         archivos_finales = list(set(archivos_finales))
         
@@ -324,12 +394,149 @@ async def main():
 
 
 
+# --- MODO WATCH (POLLING CON CURSOR) ---
+
+async def search_updated_issues(client: httpx.AsyncClient, jql: str) -> list:
+    """Ejecuta el JQL paginando con nextPageToken. Solo pide el campo 'updated' (respuesta ligera)."""
+    issues = []
+    params = {"jql": jql, "fields": "updated", "maxResults": 100}
+
+    while True:
+        response = await client.get(f"{JIRA_URL}/rest/api/3/search/jql", params=params, timeout=30.0)
+        response.raise_for_status()
+        data = response.json()
+        issues.extend(data.get('issues', []))
+
+        next_token = data.get('nextPageToken')
+        if data.get('isLast', True) or not next_token:
+            return issues
+        params["nextPageToken"] = next_token
+
+async def run_issue_pipeline(issue_key: str) -> bool:
+    """
+    Ejecuta este mismo script para una incidencia, en un proceso aparte y con su propio
+    TARGET_DIR (CP/<ISSUE_KEY>), igual que lo hace el workflow con create_folders.sh.
+    """
+    target_dir = Path("CP") / issue_key
+    target_dir.mkdir(parents=True, exist_ok=True)
+    # La marca de una ejecución anterior no debe confundirse con la de esta
+    (target_dir / SUBTASKS_MARKER).unlink(missing_ok=True)
+
+    env = {**os.environ, "ISSUE_KEY": issue_key, "TARGET_DIR": str(target_dir)}
+    process = await asyncio.create_subprocess_exec(sys.executable, __file__, env=env)
+    return await process.wait() == 0
+
+async def watch_jira_issues(jql: str):
+    """
+    Consulta Jira de forma periódica y procesa solo las incidencias con adjuntos HU nuevos.
+    El cursor y los validadores HTTP se persisten en WATCH_STATE_FILE entre ejecuciones.
+    """
+    if not all([JIRA_URL, JIRA_USER, JIRA_TOKEN, jql]):
+        print("ERROR: Modo watch requiere URL_JIRA, USER_JIRA, JIRA_TOKEN y WATCH_JQL.")
+        sys.exit(1)
+
+    state = WatchState.load(WATCH_STATE_FILE)
+    if not state.cursor:
+        # Primera ejecución: no procesamos el histórico, solo lo que cambie desde WATCH_SINCE (o desde ahora)
+        state.cursor = initial_cursor(WATCH_SINCE)
+        state.save()
+    intervalo = AdaptiveInterval(WATCH_MIN_INTERVAL, WATCH_MAX_INTERVAL)
+    print(f"Modo watch iniciado. JQL: {jql} | Cursor: {state.cursor or 'sin cursor'}")
+
+    async with httpx.AsyncClient(auth=(JIRA_USER, JIRA_TOKEN), headers={"Accept": "application/json"}) as client:
+        while True:
+            cambios = 0
+            try:
+                issues = await search_updated_issues(client, build_watch_jql(jql, state.cursor))
+                # Las incidencias llegan ordenadas por 'updated'. Si una falla, el cursor deja de avanzar
+                # para que vuelva a aparecer en la siguiente consulta.
+                cursor_bloqueado = False
+
+                for issue in issues:
+                    issue_key = issue['key']
+                    updated = issue.get('fields', {}).get('updated')
+                    entry = state.issue(issue_key)
+
+                    # Solapamiento del cursor: la incidencia ya fue revisada con este mismo 'updated'
+                    if not updated or entry['updated'] == updated:
+                        continue
+
+                    try:
+                        metadata = await fetch_jira_attachments_metadata(client, issue_key, entry['validators'])
+                    except httpx.HTTPStatusError as e:
+                        # El rate limit afecta a toda la consulta: lo maneja el bloque exterior
+                        if e.response.status_code == 429:
+                            raise
+                        # Un error de una incidencia (403, 404, 5xx) no debe frenar al resto
+                        print(f"   [Watch] Error {e.response.status_code} al consultar {issue_key}. Se reintentará en la próxima consulta.")
+                        cursor_bloqueado = True
+                        continue
+
+                    nuevos = [
+                        a for a in (metadata or [])
+                        if is_hu_file(a.get('filename', '')) and str(a.get('id')) not in entry['attachment_ids']
+                    ]
+
+                    if nuevos:
+                        cambios += 1
+                        print(f"   -> {issue_key}: {len(nuevos)} adjunto(s) HU nuevo(s).")
+                        if JOB_QUEUE_DB:
+                            # Con cola de trabajos, el watch solo encola y los workers procesan
+                            queue = JobQueue(JOB_QUEUE_DB)
+                            queue.enqueue(issue_key)
+                            queue.close()
+                        elif not await run_issue_pipeline(issue_key):
+                            # El pipeline no es idempotente: solo se reintenta si no llegó a crear subtareas
+                            # y como máximo WATCH_MAX_FAILURES veces
+                            entry['failures'] = entry.get('failures', 0) + 1
+                            if (Path("CP") / issue_key / SUBTASKS_MARKER).exists():
+                                print(f"   [Watch] Falló el proceso de {issue_key} después de crear subtareas. No se reintenta.")
+                            elif entry['failures'] < WATCH_MAX_FAILURES:
+                                print(f"   [Watch] Falló el proceso de {issue_key} (intento {entry['failures']}/{WATCH_MAX_FAILURES}). Se reintentará en la próxima consulta.")
+                                cursor_bloqueado = True
+                                state.save()
+                                continue
+                            else:
+                                print(f"   [Watch] Falló el proceso de {issue_key} {entry['failures']} veces. Se descartan sus adjuntos nuevos.")
+                        entry['failures'] = 0
+                        entry['attachment_ids'].extend(str(a.get('id')) for a in nuevos)
+                        # Guardamos tras cada pipeline: si el proceso se corta, no se repiten pipelines ya hechos
+                        state.save()
+
+                    entry['updated'] = updated
+                    if not cursor_bloqueado:
+                        state.advance_cursor(updated)
+
+                state.prune()
+                state.save()
+                espera = intervalo.next(cambios)
+
+            except httpx.HTTPStatusError as e:
+                if e.response.status_code == 429:
+                    retry_after = e.response.headers.get('Retry-After')
+                    espera = intervalo.penalize(float(retry_after) if retry_after and retry_after.isdigit() else None)
+                    print(f"   [Watch] Rate limit de Jira (429). Esperando {espera:.0f}s.")
+                else:
+                    print(f"   [Watch] Error {e.response.status_code} de Jira: {e}")
+                    espera = intervalo.next(0)
+            except httpx.RequestError as e:
+                print(f"   [Watch] Error de conexión con Jira: {e}")
+                espera = intervalo.next(0)
+
+            print(f"Próxima consulta en {espera:.0f}s.")
+            await asyncio.sleep(espera)
+
+
 # --- PUNTO DE ENTRADA PRINCIPAL ---
 if __name__ == "__main__":
 
     try:
-        # Inicia el bucle de eventos de asyncio y ejecuta la función 'main'
-        asyncio.run(main())
+        if "--watch" in sys.argv[1:]:
+            # Modo watch: python get_issue_attachments.py --watch (usa WATCH_JQL)
+            asyncio.run(watch_jira_issues(WATCH_JQL))
+        else:
+            # Inicia el bucle de eventos de asyncio y ejecuta la función 'main'
+            asyncio.run(main())
     except KeyboardInterrupt:
         print("\nProceso interrumpido por el usuario.")
         sys.exit(1)
\ No newline at end of file
@@ -1,8 +1,6 @@
 # Importaciones del punto anterior
-from concrete.readpdf import ReadPDF
-from concrete.readdoc import ReadDOCX
-from concrete.readtxt import ReadTXT
-#from concrete.readxls import READXLS
+# Los lectores concretos se importan dentro de get_reader_object (importación diferida):
+# así pypdf, python-docx u openpyxl solo se cargan cuando llega un archivo de ese tipo.
 from concrete.default import DefaultClass
 from ifactory.interface import ReadingInterface # Type: hiting
 
@@ -14,14 +12,22 @@ class ReaderFactory:
         extension = extension.lower()
 
         if extension == "pdf":
+            from concrete.readpdf import ReadPDF
             return ReadPDF() #Crea y retorna una instancia de ReadPDF
         elif extension == "txt":
+            from concrete.readtxt import ReadTXT
             return ReadTXT() #Crea y retorna una instancia de ReadTXT
         elif extension == "docx" or extension == "doc":
+            from concrete.readdoc import ReadDOCX
             return ReadDOCX() #Crea y retorna una instancia de ReadDOCX
+        elif extension == "xlsx" or extension == "xlsm":
+            from concrete.readxls import READXLS
+            return READXLS() #Crea y retorna una instancia de READXLS
+        elif extension == "csv":
+            from concrete.readcsv import ReadCSV
+            return ReadCSV() #Crea y retorna una instancia de ReadCSV
         else:
-            return DefaultClass #Crea y retorna una instancia por defecto
+            return DefaultClass() #Crea y retorna una instancia por defecto
         
         
 
-
@@ -0,0 +1,133 @@
+import os
+import sys
+import time
+import socket
+import argparse
+import subprocess
+import multiprocessing
+from pathlib import Path
+
+from services.job_queue import JobQueue
+
+# =========================================================================
+# MODO COLA DE TRABAJOS
+# Reparte el procesamiento de incidencias entre varios procesos (o varios runners que
+# comparten el mismo volumen). Cada worker reclama una incidencia de la cola SQLite y
+# ejecuta get_issue_attachments.py para ella en un proceso aparte.
+#
+#   python job_worker.py enqueue T1-1 T1-2 T1-3
+#   python job_worker.py work --workers 4 --drain
+#   python job_worker.py status
+# =========================================================================
+
+JOB_QUEUE_DB = os.getenv('JOB_QUEUE_DB', 'CP/.jobs.sqlite3')
+LEASE_SECONDS = float(os.getenv('JOB_LEASE_SECONDS', '120'))
+POLL_SECONDS = float(os.getenv('JOB_POLL_SECONDS', '5'))
+PIPELINE_SCRIPT = Path(__file__).with_name('get_issue_attachments.py')
+
+
+def run_job(queue: JobQueue, issue_key: str, token: str) -> tuple[bool, str | None]:
+    """
+    Ejecuta el pipeline para una incidencia renovando el lease mientras corre.
+    Si el lease se pierde, se detiene el proceso hijo para no duplicar subtareas.
+    """
+    target_dir = Path("CP") / issue_key
+    target_dir.mkdir(parents=True, exist_ok=True)
+
+    # El token viaja al pipeline para que compruebe el lease antes de crear subtareas en Jira
+    env = {
+        **os.environ,
+        "ISSUE_KEY": issue_key,
+        "TARGET_DIR": str(target_dir),
+        "JOB_QUEUE_DB": JOB_QUEUE_DB,
+        "JOB_LEASE_TOKEN": token,
+    }
+    process = subprocess.Popen([sys.executable, str(PIPELINE_SCRIPT)], env=env)
+
+    while True:
+        try:
+            returncode = process.wait(timeout=LEASE_SECONDS / 3)
+            break
+        except subprocess.TimeoutExpired:
+            if not queue.heartbeat(issue_key, token, LEASE_SECONDS):
+                process.kill()
+                process.wait()
+                return False, "Lease perdido durante la ejecución"
+
+    if returncode != 0:
+        return False, f"El pipeline terminó con código {returncode}"
+    return True, None
+
+
+def worker_loop(worker_id: str, drain: bool):
+    """Bucle de un worker: reclama, ejecuta y registra el resultado."""
+    queue = JobQueue(JOB_QUEUE_DB)
+    print(f"[{worker_id}] Worker iniciado (cola: {JOB_QUEUE_DB}).")
+
+    try:
+        while True:
+            claimed = queue.claim(worker_id, LEASE_SECONDS)
+
+            if claimed is None:
+                # En modo drain terminamos cuando no queda nada pendiente ni en curso
+                if drain and not queue.has_pending():
+                    print(f"[{worker_id}] Cola vacía. Finalizando.")
+                    return
+                time.sleep(POLL_SECONDS)
+                continue
+
+            issue_key, token = claimed
+            print(f"[{worker_id}] Procesando {issue_key}...")
+            ok, error = run_job(queue, issue_key, token)
+            queue.complete(issue_key, token, ok, error)
+            print(f"[{worker_id}] {issue_key}: {'OK' if ok else f'FALLÓ ({error})'}")
+    finally:
+        queue.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cola de trabajos para procesar incidencias de Jira en paralelo.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    enqueue_parser = subparsers.add_parser("enqueue", help="Encola una o varias incidencias.")
+    enqueue_parser.add_argument("issue_keys", nargs="+")
+
+    work_parser = subparsers.add_parser("work", help="Inicia procesos worker.")
+    work_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    work_parser.add_argument("--drain", action="store_true", help="Termina cuando la cola queda vacía.")
+
+    subparsers.add_parser("status", help="Muestra el estado de la cola.")
+
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        queue = JobQueue(JOB_QUEUE_DB)
+        for issue_key in args.issue_keys:
+            queue.enqueue(issue_key)
+        print(f"{len(args.issue_keys)} incidencia(s) encolada(s).")
+        queue.close()
+
+    elif args.command == "status":
+        queue = JobQueue(JOB_QUEUE_DB)
+        print(queue.counts())
+        queue.close()
+
+    elif args.command == "work":
+        host = socket.gethostname()
+        workers = [
+            multiprocessing.Process(target=worker_loop, args=(f"{host}-{os.getpid()}-{i}", args.drain))
+            for i in range(args.workers)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+
+# --- PUNTO DE ENTRADA PRINCIPAL ---
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\nProceso interrumpido por el usuario.")
+        sys.exit(1)
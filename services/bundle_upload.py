@@ -0,0 +1,155 @@
+import re
+import hashlib
+import tempfile
+import zipfile
+from pathlib import Path
+import httpx
+from services.upload_attachment_to_jira import upload_attachment_to_jira
+
+# --- EMPAQUETADO DE LA CARPETA DE LA INCIDENCIA ---
+# En lugar de subir cada archivo generado por separado (una petición HTTP por archivo),
+# se comprimen las carpetas generadas por HU dentro de CP/<ISSUE_KEY> en un único ZIP y se
+# sube como un solo adjunto. Los archivos HU descargados (raíz de la carpeta) ya están en Jira.
+# El nombre del ZIP lleva el hash del contenido: si no cambió, no se vuelve a subir.
+
+CHUNK_SIZE = 1024 * 1024 # 1 MB por bloque
+HASH_LENGTH = 12 # Caracteres del hash que van en el nombre del archivo
+_BUNDLE_NAME = re.compile(rf"^CP_.+_[0-9a-f]{{{HASH_LENGTH}}}\.zip$")
+
+
+def _bundle_prefix(issue_key: str) -> str:
+    return f"CP_{issue_key}_"
+
+
+def is_bundle_name(filename: str) -> bool:
+    """
+    Indica si un adjunto es un bundle generado por este proceso (CP_<ISSUE_KEY>_<hash>.zip).
+    El pipeline debe ignorarlos: si la clave del proyecto contiene "hu" (ej: HU-12) el
+    bundle pasaría el filtro de HU y se volvería a procesar.
+    """
+    return bool(_BUNDLE_NAME.match(filename))
+
+
+def _files_to_bundle(issue_dir: Path) -> list[Path]:
+    # Solo el contenido de las subcarpetas (una por HU, ver generate_folder_structure): los archivos
+    # de la raíz son los adjuntos descargados. Se omiten los archivos y carpetas ocultos
+    # (ej: .partial/ de las descargas incompletas) y cualquier bundle previo
+    return sorted(
+        path for path in issue_dir.rglob("*")
+        if path.is_file()
+        and len(path.relative_to(issue_dir).parts) > 1
+        and not any(part.startswith(".") for part in path.relative_to(issue_dir).parts)
+        and not is_bundle_name(path.name)
+    )
+
+
+def write_bundle(issue_dir: Path, zip_file) -> str:
+    """
+    Comprime las carpetas de 'issue_dir' en 'zip_file' leyendo cada archivo una sola vez:
+    cada bloque se escribe en el ZIP y alimenta el hash del contenido (sin copias intermedias).
+    :return: El hash SHA-256 del contenido (rutas relativas + bytes de cada archivo).
+    """
+    content_hash = hashlib.sha256()
+
+    with zipfile.ZipFile(zip_file, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for path in _files_to_bundle(issue_dir):
+            arcname = path.relative_to(issue_dir).as_posix()
+            content_hash.update(arcname.encode('utf-8') + b"\0")
+
+            with open(path, 'rb') as source, archive.open(arcname, 'w') as target:
+                while chunk := source.read(CHUNK_SIZE):
+                    content_hash.update(chunk)
+                    target.write(chunk)
+
+    return content_hash.hexdigest()
+
+
+def _existing_bundles(issue_key: str, jira_url: str, auth: tuple[str, str]) -> list[dict]:
+    """Retorna los adjuntos de la incidencia que son bundles generados por este proceso."""
+    response = httpx.get(
+        f"{jira_url.rstrip('/')}/rest/api/2/issue/{issue_key}",
+        params={"fields": "attachment"},
+        auth=auth,
+        headers={"Accept": "application/json"},
+        timeout=30,
+    )
+    response.raise_for_status()
+    attachments = response.json().get('fields', {}).get('attachment', [])
+    return [a for a in attachments if a.get('filename', '').startswith(_bundle_prefix(issue_key)) and a['filename'].endswith('.zip')]
+
+
+def upload_issue_bundle(
+    issue_dir: Path,
+    issue_key: str,
+    jira_url: str,
+    jira_user: str,
+    jira_token: str
+) -> str | None:
+    """
+    Empaqueta la carpeta de la incidencia y la sube a Jira como un único adjunto ZIP.
+    Si ya existe un bundle con el mismo hash no se sube nada; si existe uno anterior
+    con otro hash, se reemplaza (se sube el nuevo y se borra el viejo).
+
+    :param issue_dir: Carpeta de la incidencia (ej: CP/T1-1).
+    :param issue_key: Clave de la incidencia (ej: T1-1).
+    :return: El nombre del bundle presente en Jira, o None si falló.
+    """
+    if not issue_dir.is_dir():
+        print(f"ERROR BUNDLE: La carpeta no existe: {issue_dir}")
+        return None
+
+    if not all([jira_url, jira_user, jira_token]):
+        print("ERROR BUNDLE: Faltan credenciales de Jira.")
+        return None
+
+    if not _files_to_bundle(issue_dir):
+        print(f"  -> BUNDLE omitido: no hay carpetas generadas en {issue_dir}.")
+        return None
+
+    auth = (jira_user, jira_token) # httpx lo envía como Basic Auth
+
+    # El ZIP se escribe en un directorio temporal fuera del árbol que se comprime
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tmp_zip = Path(tmp_dir) / "bundle.zip"
+        try:
+            content_hash = write_bundle(issue_dir, tmp_zip)
+        except (OSError, zipfile.BadZipFile, zipfile.LargeZipFile) as e:
+            # Ej: disco lleno o un archivo que desapareció mientras se comprimía
+            print(f"ERROR BUNDLE: No se pudo crear el ZIP de {issue_dir}: {e}")
+            return None
+        bundle_name = f"{_bundle_prefix(issue_key)}{content_hash[:HASH_LENGTH]}.zip"
+
+        try:
+            existing = _existing_bundles(issue_key, jira_url, auth)
+        except httpx.HTTPError as e:
+            print(f"ERROR BUNDLE: No se pudieron consultar los adjuntos de {issue_key}: {e}")
+            return None
+
+        if any(a['filename'] == bundle_name for a in existing):
+            print(f"  -> BUNDLE sin cambios: '{bundle_name}' ya está adjunto a {issue_key}.")
+            return bundle_name
+
+        bundle_path = tmp_zip.rename(Path(tmp_dir) / bundle_name)
+        try:
+            uploaded = upload_attachment_to_jira(bundle_path, issue_key, jira_url, jira_user, jira_token, mime_type='application/zip')
+        except httpx.HTTPError as e:
+            print(f"ERROR BUNDLE: Falló la subida de '{bundle_name}' a {issue_key}: {e}")
+            return None
+        if not uploaded:
+            return None
+
+    # Solo tras subir el nuevo bundle se eliminan los anteriores. Si un borrado falla, el nuevo
+    # bundle ya está en Jira: se informa y se sigue (el anterior se reintenta en la próxima subida)
+    for old in existing:
+        try:
+            response = httpx.delete(f"{jira_url.rstrip('/')}/rest/api/2/attachment/{old['id']}", auth=auth, timeout=30)
+        except httpx.HTTPError as e:
+            print(f"  -> No se pudo eliminar el bundle anterior '{old['filename']}': {e}")
+            continue
+
+        if response.status_code == 204:
+            print(f"  -> BUNDLE anterior eliminado: '{old['filename']}'.")
+        else:
+            print(f"  -> No se pudo eliminar el bundle anterior '{old['filename']}': Error {response.status_code}.")
+
+    return bundle_name
@@ -0,0 +1,112 @@
+import os
+import re
+import math
+from collections import Counter
+
+# --- COMPACTACIÓN DEL TEXTO ANTES DEL PROMPT ---
+# El texto extraído (sobre todo de PDF en modo "layout") trae muchos espacios de relleno,
+# encabezados/pies de página repetidos y palabras cortadas con guion. Todo eso consume
+# tokens del prompt sin aportar información.
+
+PAGE_BREAK = "\f" # Separador de páginas que emite ReadPDF
+PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', '6000'))
+CHARS_PER_TOKEN = 4 # Estimación aproximada (sin tokenizer): ~4 caracteres por token
+HEADER_FOOTER_RATIO = 0.9 # Proporción mínima de páginas en las que debe repetirse la línea
+SHORT_LINE_CHARS = 12 # Líneas tan cortas suelen ser numeración ("- 3 -", "3/40")
+
+_SPACES = re.compile(r"[ \t\u00a0]+")
+_DIGITS = re.compile(r"\d+")
+_PAGE_NUMBER = re.compile(r"^\W*(p[aá]g(ina)?\.?|page)?\s*\d+\s*((de|of|/)\s*\d+)?\W*$", re.IGNORECASE)
+_HYPHENATED = re.compile(r"(\w)-\n([a-záéíóúñü])")
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _line_signature(line: str) -> str:
+    # Solo la numeración de página cambia entre páginas ("Página 3 de 40"): ahí se ignoran los números.
+    # En el resto de líneas los números se conservan ("Escenario 1" y "Escenario 2" son distintas).
+    line = line.lower()
+    if len(line) <= SHORT_LINE_CHARS or _PAGE_NUMBER.match(line):
+        return _DIGITS.sub("#", line)
+    return line
+
+
+def _remove_headers_footers(pages: list[list[str]]) -> int:
+    """
+    Elimina (in place) la primera y la última línea de cada página cuando se repiten
+    en casi todas las páginas (encabezado y pie de página).
+    """
+    if len(pages) < 3:
+        return 0
+
+    # Solo el primer y el último renglón con contenido de cada página son candidatos.
+    # Las páginas muy cortas no se consideran: sus "bordes" serían el propio contenido.
+    edge_indexes = []
+    for lines in pages:
+        content_idx = [i for i, line in enumerate(lines) if line]
+        edge_indexes.append({content_idx[0], content_idx[-1]} if len(content_idx) > 2 else set())
+
+    candidates = Counter()
+    for lines, edges in zip(pages, edge_indexes):
+        candidates.update({_line_signature(lines[i]) for i in edges})
+
+    minimum = max(3, math.ceil(len(pages) * HEADER_FOOTER_RATIO))
+    repeated = {signature for signature, count in candidates.items() if count >= minimum}
+    if not repeated:
+        return 0
+
+    removed = 0
+    for lines, edges in zip(pages, edge_indexes):
+        for i in edges:
+            if _line_signature(lines[i]) in repeated:
+                lines[i] = ""
+                removed += 1
+    return removed
+
+
+def _trim_to_budget(text: str, token_budget: int) -> str:
+    # Cortamos en el último salto de línea dentro del presupuesto para no partir frases
+    max_chars = token_budget * CHARS_PER_TOKEN
+    cut = text.rfind("\n", 0, max_chars)
+    return text[:cut if cut > 0 else max_chars].rstrip()
+
+
+def compact_text(text: str, token_budget: int = PROMPT_TOKEN_BUDGET) -> tuple[str, dict]:
+    """
+    Normaliza el texto de un documento para usarlo en el prompt.
+
+    1. Colapsa los espacios de relleno del modo "layout".
+    2. Elimina encabezados y pies de página repetidos entre páginas.
+    3. Une palabras cortadas con guion al final de línea.
+    4. Recorta el texto al presupuesto de tokens (token_budget <= 0 desactiva el recorte).
+
+    :return: El texto compactado y un reporte con lo que se eliminó.
+    """
+    report = {"tokens_in": estimate_tokens(text)}
+
+    # 1. Espacios: por línea, sin relleno a los lados y con un solo espacio entre palabras
+    pages = [
+        [_SPACES.sub(" ", line).strip() for line in page.splitlines()]
+        for page in text.split(PAGE_BREAK)
+    ]
+
+    # 2. Encabezados y pies de página
+    report["header_footer_lines"] = _remove_headers_footers(pages)
+    text = "\n".join("\n".join(lines) for lines in pages)
+
+    # 3. Palabras cortadas con guion ("implemen-\ntación" -> "implementación")
+    text, report["dehyphenated"] = _HYPHENATED.subn(r"\1\2", text)
+    text = _BLANK_LINES.sub("\n\n", text).strip()
+
+    # 4. Presupuesto de tokens
+    report["tokens_dropped"] = 0
+    if token_budget > 0 and estimate_tokens(text) > token_budget:
+        trimmed = _trim_to_budget(text, token_budget)
+        report["tokens_dropped"] = estimate_tokens(text) - estimate_tokens(trimmed)
+        text = trimmed
+
+    report["tokens_out"] = estimate_tokens(text)
+    return text, report
@@ -1,4 +1,3 @@
-import pandas as pd
 from io import StringIO
 import uuid
 from pathlib import Path
@@ -14,6 +13,8 @@ def createxlsx(csv_text: str, target_dir: Path, name_issue: str) -> Path:
     :param name_issue: La clave de la incidencia (ej: T1-1).
     :return: La ruta completa del archivo XLSX creado.
     """
+    # Importación diferida: pandas (y XlsxWriter) solo se cargan cuando se genera el XLSX
+    import pandas as pd
 
     # --- 1. LIMPIEZA Y NORMALIZACIÓN DE DATOS ---
     limpio_text = '\n'.join([line.strip() for line in csv_text.strip().split('\n') if line.strip()])
@@ -1,6 +1,33 @@
 import os
-from pypdf import PdfReader
-from openai import OpenAI
+import json
+import time
+import asyncio
+from pathlib import Path
+from typing import TYPE_CHECKING
+from services.compact_text import compact_text
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+# ******************************************************************
+# CONFIGURACIÓN DE MODELOS (HEDGING)
+# Lista de modelos en orden de preferencia. Si el primero no empieza a responder en
+# LLM_HEDGE_DELAY segundos (o falla), se lanza el mismo prompt al siguiente; gana la
+# primera respuesta CSV válida y el resto de peticiones se cancelan.
+LLM_MODELS = [m.strip() for m in os.getenv('LLM_MODELS', 'google/gemma-3-4b-it:free').split(',') if m.strip()]
+LLM_HEDGE_DELAY = float(os.getenv('LLM_HEDGE_DELAY', '20'))
+LLM_REQUEST_TIMEOUT = float(os.getenv('LLM_REQUEST_TIMEOUT', '300'))
+# Circuit breaker: tras N fallos seguidos el modelo se omite durante el tiempo de enfriamiento
+LLM_BREAKER_FAILURES = int(os.getenv('LLM_BREAKER_FAILURES', '3'))
+LLM_BREAKER_COOLDOWN = float(os.getenv('LLM_BREAKER_COOLDOWN', '300'))
+# Archivo JSONL donde se registran el ganador y las latencias de cada consulta (opcional)
+LLM_METRICS_FILE = os.getenv('LLM_METRICS_FILE')
+# Estado de los breakers. Cada incidencia se procesa en un proceso nuevo, así que el estado
+# se persiste en disco (junto a LLM_METRICS_FILE si está configurado)
+LLM_BREAKER_FILE = Path(os.getenv(
+    'LLM_BREAKER_FILE',
+    str(Path(LLM_METRICS_FILE).with_name('llm_breakers.json')) if LLM_METRICS_FILE else 'CP/.llm_breakers.json',
+))
 
 # ******************************************************************
 # 1. BASE DEL PROMPT (Ahora como una plantilla sin la variable issue)
@@ -41,34 +68,220 @@ def send_chat(text_doc: str, name_issue: str) -> str:
         # Primero formateamos la plantilla con el valor de name_issue
         prompt_formateado = texto_plantilla.format(issue_code=name_issue)
         
+        # Compactamos el texto del documento (espacios, encabezados/pies, guiones, presupuesto de tokens)
+        text_doc, reporte = compact_text(text_doc)
+        print(
+            f"   -> [Prompt] Tokens aprox.: {reporte['tokens_in']} -> {reporte['tokens_out']} "
+            f"(encabezados/pies eliminados: {reporte['header_footer_lines']}, "
+            f"guiones unidos: {reporte['dehyphenated']}, recortados por presupuesto: {reporte['tokens_dropped']})"
+        )
+
         # Ahora concatenamos la información completa
         prompt_completo = prompt_formateado + text_doc
         
-        # generamos la consulta a chatgpt
-        client = OpenAI(
-        base_url="https://openrouter.ai/api/v1",
-        api_key= os.getenv('OPENROUTER_APIKEY'),
-        )
+        # generamos la consulta con hedging entre los modelos configurados.
+        # send_chat sigue siendo síncrona (se invoca con asyncio.to_thread), por eso usamos asyncio.run
+        csv_text = asyncio.run(_send_chat_hedged(prompt_completo, name_issue))
+        return csv_text
+        
+    except FileNotFoundError:
+        # ... (código de manejo de errores omitido por brevedad)
+        return ""
+
+# ******************************************************************
+# HEDGING Y CIRCUIT BREAKER
+
+class CircuitBreaker:
+    """
+    Cuenta los fallos seguidos de un modelo y lo 'abre' (lo omite) durante un tiempo.
+    Pasado el enfriamiento se permite una consulta de prueba: si vuelve a fallar, se abre de nuevo.
+    """
+
+    def __init__(self, failures: int = 0, open_until: float = 0.0):
+        self.failures = failures
+        self.open_until = open_until # Hora de reloj (time.time()): se compara entre procesos
+
+    def allows(self) -> bool:
+        return time.time() >= self.open_until
+
+    def record_success(self):
+        self.failures = 0
+        self.open_until = 0.0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.failures >= LLM_BREAKER_FAILURES:
+            self.open_until = time.time() + LLM_BREAKER_COOLDOWN
+            print(f"   -> [IA] Circuit breaker abierto durante {LLM_BREAKER_COOLDOWN:.0f}s.")
+
+
+def _load_breakers() -> dict[str, CircuitBreaker]:
+    # Si el archivo no existe o está corrupto, todos los breakers empiezan cerrados
+    try:
+        with open(LLM_BREAKER_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return {model: CircuitBreaker(s.get("failures", 0), s.get("open_until", 0.0)) for model, s in data.items()}
+    except (FileNotFoundError, json.JSONDecodeError, AttributeError):
+        return {}
+
+
+def _save_breakers(breakers: dict[str, CircuitBreaker]):
+    """
+    Guarda los breakers de los modelos consultados. Se relee el archivo justo antes para no
+    pisar lo que otro proceso haya registrado de otros modelos mientras tanto.
+    """
+    data = {model: vars(b) for model, b in _load_breakers().items()}
+    data.update({model: vars(b) for model, b in breakers.items()})
+
+    # Escritura atómica: primero a un temporal y luego se reemplaza
+    LLM_BREAKER_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = LLM_BREAKER_FILE.with_suffix(LLM_BREAKER_FILE.suffix + f".{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    tmp_path.replace(LLM_BREAKER_FILE)
+
+
+def _is_valid_csv(text: str | None) -> bool:
+    # Respuesta válida: al menos un encabezado y una fila separados por punto y coma
+    lineas = [line for line in (text or "").splitlines() if ";" in line]
+    return len(lineas) >= 2
 
-        completion = client.chat.completions.create(
+
+async def _ask_model(client: "AsyncOpenAI", attempt: dict, prompt: str) -> str:
+    """Consulta un modelo en streaming, marcando el momento del primer token."""
+    stream = await client.chat.completions.create(
         extra_headers={
             "HTTP-Referer": "<YOUR_SITE_URL>",
             "X-Title": "<YOUR_SITE_NAME>",
         },
         extra_body={},
-        model="google/gemma-3-4b-it:free",
+        model=attempt["model"],
         messages=[
                     {
                         "role": "user",
                         # Aquí pasamos el prompt completo
-                        "content": prompt_completo 
+                        "content": prompt
                     }
-                ]
-        )
-        # la respuesta la podemos almacenar en una variable
-        csv_text = completion.choices[0].message.content
-        return csv_text
-        
-    except FileNotFoundError:
-        # ... (código de manejo de errores omitido por brevedad)
+                ],
+        stream=True,
+    )
+
+    partes = []
+    async for chunk in stream:
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            if attempt["first_token_s"] is None:
+                attempt["first_token_s"] = round(time.monotonic() - attempt["t0"], 3)
+            partes.append(delta)
+    return "".join(partes)
+
+
+async def _send_chat_hedged(prompt: str, name_issue: str) -> str:
+    """
+    Lanza el prompt al modelo principal y, si no empieza a responder a tiempo o falla,
+    a los modelos de respaldo. Retorna la primera respuesta CSV válida ("" si ninguna lo es).
+    """
+    # Importación diferida: openai solo se carga cuando la etapa de IA realmente se ejecuta
+    from openai import AsyncOpenAI
+
+    # Solo se consultan los modelos con el breaker cerrado. Si todos están abiertos la etapa
+    # falla rápido, sin esperar a los timeouts de un proveedor que sabemos caído.
+    breakers = _load_breakers()
+    modelos = [m for m in LLM_MODELS if breakers.setdefault(m, CircuitBreaker()).allows()]
+    if not modelos:
+        reapertura = min(breakers[m].open_until for m in LLM_MODELS) - time.time()
+        print(f"   -> [IA] Todos los modelos tienen el circuit breaker abierto (próximo intento en {reapertura:.0f}s).")
+        _record_metrics(name_issue, None, [])
         return ""
+
+    client = AsyncOpenAI(
+        base_url="https://openrouter.ai/api/v1",
+        api_key= os.getenv('OPENROUTER_APIKEY'),
+        timeout=LLM_REQUEST_TIMEOUT,
+    )
+    pending: dict[asyncio.Task, dict] = {}
+    attempts = []
+    winner = None
+    csv_text = ""
+
+    def lanzar():
+        attempt = {"model": modelos[len(attempts)], "t0": time.monotonic(), "first_token_s": None}
+        attempts.append(attempt)
+        pending[asyncio.create_task(_ask_model(client, attempt, prompt))] = attempt
+        print(f"   -> [IA] Consultando modelo: {attempt['model']}")
+
+    try:
+        lanzar()
+        while pending:
+            hay_respaldo = len(attempts) < len(modelos)
+            alguno_responde = any(a["first_token_s"] is not None for a in pending.values())
+
+            # Solo esperamos con límite si aún hay un modelo de respaldo y nadie ha empezado a responder
+            timeout = None
+            if hay_respaldo and not alguno_responde:
+                timeout = max(0.0, attempts[-1]["t0"] + LLM_HEDGE_DELAY - time.monotonic())
+
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                if not any(a["first_token_s"] is not None for a in pending.values()):
+                    print(f"   -> [IA] Sin respuesta tras {LLM_HEDGE_DELAY:.0f}s. Lanzando modelo de respaldo.")
+                    lanzar()
+                continue
+
+            for task in done:
+                attempt = pending.pop(task)
+                attempt["latency_s"] = round(time.monotonic() - attempt["t0"], 3)
+                try:
+                    text = task.result()
+                    attempt["outcome"] = "ok" if _is_valid_csv(text) else "invalid"
+                except Exception as e:
+                    text = None
+                    attempt["outcome"] = f"error: {e}"
+
+                if attempt["outcome"] == "ok" and winner is None:
+                    breakers[attempt["model"]].record_success()
+                    winner, csv_text = attempt["model"], text
+                elif attempt["outcome"] != "ok":
+                    breakers[attempt["model"]].record_failure()
+                    # Un fallo lanza de inmediato el siguiente modelo, sin esperar al umbral
+                    if winner is None and len(attempts) < len(modelos):
+                        lanzar()
+
+            if winner:
+                break
+    finally:
+        # Cancelamos las peticiones que siguen en curso (perdieron la carrera)
+        for task, attempt in pending.items():
+            task.cancel()
+            attempt["outcome"] = "cancelled"
+            attempt["latency_s"] = round(time.monotonic() - attempt["t0"], 3)
+        await asyncio.gather(*pending, return_exceptions=True)
+        await client.close()
+        # Solo se guardan los modelos consultados: los cancelados no cambian su estado
+        _save_breakers({a["model"]: breakers[a["model"]] for a in attempts})
+
+    _record_metrics(name_issue, winner, attempts)
+    return csv_text
+
+
+def _record_metrics(name_issue: str, winner: str | None, attempts: list):
+    """Muestra y (opcionalmente) guarda el ganador y las latencias para ajustar los umbrales."""
+    for attempt in attempts:
+        primer_token = f"{attempt['first_token_s']}s" if attempt['first_token_s'] is not None else "-"
+        print(
+            f"   -> [IA] {attempt['model']}: {attempt.get('outcome')} | "
+            f"primer token: {primer_token} | total: {attempt.get('latency_s')}s"
+        )
+    print(f"   -> [IA] Modelo ganador: {winner or 'ninguno'}")
+
+    if LLM_METRICS_FILE:
+        record = {
+            "issue": name_issue,
+            "timestamp": time.time(),
+            "winner": winner,
+            "hedge_delay_s": LLM_HEDGE_DELAY,
+            "attempts": [{k: v for k, v in a.items() if k != "t0"} for a in attempts],
+        }
+        with open(LLM_METRICS_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + "\n")
@@ -0,0 +1,139 @@
+import json
+import math
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# --- UTILIDADES PARA EL MODO WATCH (POLLING) ---
+# El modo watch consulta Jira periódicamente con un JQL y un cursor persistido
+# ('updated >= cursor'), de modo que solo se revisan las incidencias que cambiaron.
+
+# Margen de solapamiento de la consulta: build_watch_jql redondea hacia arriba y suma un minuto
+CURSOR_OVERLAP = timedelta(minutes=2)
+
+def parse_jira_datetime(valor: str) -> datetime:
+    """
+    Convierte una fecha de Jira (ej: 2024-05-01T10:23:45.123-0500) en un datetime con zona horaria.
+    """
+    return datetime.strptime(valor, "%Y-%m-%dT%H:%M:%S.%f%z")
+
+
+def format_jira_datetime(valor: datetime) -> str:
+    """Convierte un datetime con zona horaria al formato de fecha de Jira (inverso de parse_jira_datetime)."""
+    return valor.strftime("%Y-%m-%dT%H:%M:%S.%f%z")
+
+
+def initial_cursor(since: str | None) -> str:
+    """
+    Cursor para la primera ejecución (sin archivo de estado). Sin él, la primera consulta
+    procesaría todo el histórico del JQL y crearía subtareas en incidencias antiguas.
+
+    :param since: Fecha ISO (ej: 2024-05-01T00:00, se asume UTC si no trae zona) o None para "ahora".
+    """
+    inicio = datetime.fromisoformat(since) if since else datetime.now(timezone.utc)
+    if inicio.tzinfo is None:
+        inicio = inicio.replace(tzinfo=timezone.utc)
+    return format_jira_datetime(inicio)
+
+
+def build_watch_jql(base_jql: str, cursor: str | None) -> str:
+    """
+    Construye el JQL de la consulta añadiendo la marca de agua 'updated >= cursor'.
+
+    Usamos una fecha relativa en minutos ("-15m") en lugar de una fecha absoluta porque
+    JQL interpreta las fechas absolutas en la zona horaria del usuario, mientras que el
+    campo 'updated' llega con su propio offset. El minuto extra solapa consultas; los
+    duplicados se descartan comparando el 'updated' guardado de cada incidencia.
+    """
+    condiciones = [f"({base_jql})"] if base_jql else []
+
+    if cursor:
+        transcurrido = datetime.now(timezone.utc) - parse_jira_datetime(cursor)
+        minutos = max(1, math.ceil(transcurrido.total_seconds() / 60) + 1)
+        condiciones.append(f'updated >= "-{minutos}m"')
+
+    return " AND ".join(condiciones) + " ORDER BY updated ASC"
+
+
+class WatchState:
+    """
+    Estado persistido del modo watch: el cursor y, por incidencia, el último 'updated'
+    visto, los validadores HTTP (ETag / Last-Modified), los adjuntos ya procesados y los
+    fallos consecutivos del pipeline.
+    """
+
+    def __init__(self, path: Path, data: dict):
+        self.path = path
+        self.cursor = data.get("cursor")
+        self.issues = data.get("issues", {})
+
+    @classmethod
+    def load(cls, path: Path) -> "WatchState":
+        # Si el archivo no existe o está corrupto arrancamos sin cursor (primera consulta completa)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return cls(path, json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError):
+            return cls(path, {})
+
+    def issue(self, issue_key: str) -> dict:
+        return self.issues.setdefault(
+            issue_key, {"updated": None, "validators": {}, "attachment_ids": [], "failures": 0}
+        )
+
+    def advance_cursor(self, updated: str):
+        # El cursor solo avanza, nunca retrocede
+        if not self.cursor or parse_jira_datetime(updated) > parse_jira_datetime(self.cursor):
+            self.cursor = updated
+
+    def prune(self):
+        """
+        Compacta las incidencias que quedaron detrás del cursor: la consulta ya no las devuelve
+        salvo que cambie su 'updated', así que sus validadores no sirven. Se conservan solo los
+        adjuntos procesados (evitan repetir el pipeline si la incidencia se edita más adelante)
+        y se eliminan las que no tienen ninguno.
+        """
+        if not self.cursor:
+            return
+        limite = parse_jira_datetime(self.cursor) - CURSOR_OVERLAP
+
+        for issue_key, entry in list(self.issues.items()):
+            if entry.get("failures") or not entry.get("updated") or parse_jira_datetime(entry["updated"]) >= limite:
+                continue
+            if entry.get("attachment_ids"):
+                self.issues[issue_key] = {
+                    "updated": None, "validators": {}, "attachment_ids": entry["attachment_ids"], "failures": 0
+                }
+            else:
+                del self.issues[issue_key]
+
+    def save(self):
+        # Escritura atómica: primero a un temporal y luego se reemplaza
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"cursor": self.cursor, "issues": self.issues}, f, indent=2)
+        tmp_path.replace(self.path)
+
+
+class AdaptiveInterval:
+    """
+    Intervalo de consulta que se adapta a la frecuencia de cambios:
+    se reduce a la mitad cuando hubo cambios y crece un 50% cuando no los hubo.
+    """
+
+    def __init__(self, minimo: float, maximo: float):
+        self.minimo = minimo
+        self.maximo = maximo
+        self.actual = minimo
+
+    def next(self, cambios: int) -> float:
+        if cambios:
+            self.actual = max(self.minimo, self.actual / 2)
+        else:
+            self.actual = min(self.maximo, self.actual * 1.5)
+        return self.actual
+
+    def penalize(self, retry_after: float | None = None) -> float:
+        # Usado ante un 429 (rate limit): respetamos Retry-After si Jira lo envía
+        self.actual = min(self.maximo, max(self.actual * 2, retry_after or 0))
+        return max(self.actual, retry_after or 0)
@@ -0,0 +1,150 @@
+import sqlite3
+import time
+import uuid
+from pathlib import Path
+
+# --- COLA DE TRABAJOS LOCAL (SQLITE) ---
+# Cada fila es una incidencia (issue_key es la clave primaria), por lo que nunca hay dos
+# trabajos activos para la misma incidencia. Un worker "reclama" una incidencia tomando un
+# lease (token + fecha de expiración) que renueva mientras trabaja. Si el worker muere, el
+# lease expira y otro worker puede reclamarla.
+#
+# Nota: varios runners pueden compartir el archivo en un volumen común siempre que el
+# sistema de archivos soporte los locks de SQLite (NFS suele no hacerlo de forma fiable).
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    issue_key     TEXT PRIMARY KEY,
+    status        TEXT NOT NULL DEFAULT 'pending', -- pending | running | done | failed
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    rerun         INTEGER NOT NULL DEFAULT 0,      -- se volvió a encolar mientras corría
+    lease_owner   TEXT,
+    lease_token   TEXT,
+    lease_expires REAL,
+    last_error    TEXT,
+    enqueued_at   REAL NOT NULL,
+    finished_at   REAL
+)
+"""
+
+
+class JobQueue:
+    def __init__(self, db_path: str | Path, max_attempts: int = 3):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        # isolation_level=None: controlamos las transacciones manualmente con BEGIN IMMEDIATE
+        self.conn = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)
+        self.conn.execute(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def enqueue(self, issue_key: str):
+        """Encola una incidencia. Si ya está corriendo, se marca para volver a ejecutarse al terminar."""
+        self.conn.execute(
+            """
+            INSERT INTO jobs (issue_key, enqueued_at) VALUES (?, ?)
+            ON CONFLICT(issue_key) DO UPDATE SET
+                status   = CASE WHEN status = 'running' THEN status ELSE 'pending' END,
+                rerun    = CASE WHEN status = 'running' THEN 1 ELSE 0 END,
+                attempts = CASE WHEN status = 'running' THEN attempts ELSE 0 END,
+                enqueued_at = excluded.enqueued_at
+            """,
+            (issue_key, time.time()),
+        )
+
+    def claim(self, owner: str, lease_seconds: float) -> tuple[str, str] | None:
+        """
+        Reclama el trabajo pendiente más antiguo (o uno cuyo lease expiró y aún tiene intentos).
+        :return: (issue_key, lease_token) o None si no hay trabajo.
+        """
+        now = time.time()
+        token = uuid.uuid4().hex
+
+        # BEGIN IMMEDIATE toma el lock de escritura: dos workers no pueden reclamar la misma fila
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Un lease expirado sin intentos restantes indica que el worker murió en cada intento
+            # (OOM, cuelgue): se marca como fallido en lugar de reclamarlo para siempre
+            self.conn.execute(
+                """
+                UPDATE jobs SET status = 'failed', rerun = 0,
+                    lease_owner = NULL, lease_token = NULL, lease_expires = NULL,
+                    last_error = 'Lease expirado: el worker dejó de responder en el último intento',
+                    finished_at = ?
+                WHERE status = 'running' AND lease_expires < ? AND attempts >= ?
+                """,
+                (now, now, self.max_attempts),
+            )
+
+            row = self.conn.execute(
+                """
+                SELECT issue_key FROM jobs
+                WHERE status = 'pending' OR (status = 'running' AND lease_expires < ? AND attempts < ?)
+                ORDER BY enqueued_at LIMIT 1
+                """,
+                (now, self.max_attempts),
+            ).fetchone()
+
+            if row is None:
+                self.conn.execute("COMMIT")
+                return None
+
+            self.conn.execute(
+                """
+                UPDATE jobs SET status = 'running', attempts = attempts + 1,
+                    lease_owner = ?, lease_token = ?, lease_expires = ?
+                WHERE issue_key = ?
+                """,
+                (owner, token, now + lease_seconds, row[0]),
+            )
+            self.conn.execute("COMMIT")
+            return row[0], token
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def heartbeat(self, issue_key: str, token: str, lease_seconds: float) -> bool:
+        """Renueva el lease. Retorna False si el lease se perdió (expiró y lo reclamó otro worker)."""
+        cursor = self.conn.execute(
+            "UPDATE jobs SET lease_expires = ? WHERE issue_key = ? AND lease_token = ? AND status = 'running'",
+            (time.time() + lease_seconds, issue_key, token),
+        )
+        return cursor.rowcount == 1
+
+    def holds_lease(self, issue_key: str, token: str) -> bool:
+        """Comprueba que el token sigue siendo el dueño vigente de la incidencia."""
+        row = self.conn.execute(
+            "SELECT 1 FROM jobs WHERE issue_key = ? AND lease_token = ? AND status = 'running' AND lease_expires >= ?",
+            (issue_key, token, time.time()),
+        ).fetchone()
+        return row is not None
+
+    def complete(self, issue_key: str, token: str, ok: bool, error: str | None = None):
+        """
+        Registra el resultado. Un fallo vuelve a 'pending' mientras queden intentos;
+        si la incidencia se re-encoló mientras corría, vuelve a 'pending' igualmente.
+        """
+        self.conn.execute(
+            """
+            UPDATE jobs SET
+                status = CASE
+                    WHEN rerun = 1 THEN 'pending'
+                    WHEN ? THEN 'done'
+                    WHEN attempts < ? THEN 'pending'
+                    ELSE 'failed' END,
+                attempts = CASE WHEN rerun = 1 THEN 0 ELSE attempts END,
+                rerun = 0, lease_owner = NULL, lease_token = NULL, lease_expires = NULL,
+                last_error = ?, finished_at = ?
+            WHERE issue_key = ? AND lease_token = ?
+            """,
+            (1 if ok else 0, self.max_attempts, error, time.time(), issue_key, token),
+        )
+
+    def counts(self) -> dict:
+        return dict(self.conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+
+    def has_pending(self) -> bool:
+        row = self.conn.execute("SELECT 1 FROM jobs WHERE status IN ('pending', 'running') LIMIT 1").fetchone()
+        return row is not None
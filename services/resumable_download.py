@@ -0,0 +1,152 @@
+import asyncio
+import json
+from pathlib import Path
+import httpx
+
+# --- DESCARGAS REANUDABLES ---
+# Mientras se descarga, el archivo vive en <target_dir>/.partial/<nombre>.part junto a un
+# sidecar <nombre>.json con la URL de media resuelta y los bytes recibidos. Si la descarga
+# se corta, el siguiente intento pide solo los bytes que faltan con una cabecera Range.
+
+PARTIAL_DIR_NAME = ".partial"
+CHUNK_SIZE = 1024 * 1024 # 1 MB por bloque
+SIDECAR_EVERY = 8 * CHUNK_SIZE # Cada cuántos bytes se actualiza el sidecar
+DOWNLOAD_TIMEOUT = httpx.Timeout(30.0, read=120.0) # Ya no usamos timeout=None: un socket colgado se reintenta
+EXPIRED_MEDIA_STATUS = {401, 403, 404, 410} # La URL firmada de media caducó: volvemos a resolverla
+
+
+def _partial_paths(filepath: Path) -> tuple[Path, Path]:
+    partial_dir = filepath.parent / PARTIAL_DIR_NAME
+    return partial_dir / f"{filepath.name}.part", partial_dir / f"{filepath.name}.json"
+
+
+def _load_sidecar(sidecar_path: Path, source_url: str) -> dict | None:
+    # El sidecar solo es válido si corresponde al mismo adjunto
+    try:
+        with open(sidecar_path, 'r', encoding='utf-8') as f:
+            sidecar = json.load(f)
+        if sidecar.get("source_url") == source_url:
+            return sidecar
+    except (FileNotFoundError, json.JSONDecodeError):
+        pass
+    return None
+
+
+def _save_sidecar(sidecar_path: Path, sidecar: dict):
+    with open(sidecar_path, 'w', encoding='utf-8') as f:
+        json.dump(sidecar, f)
+
+
+def _range_start(response: httpx.Response) -> int | None:
+    # Content-Range: bytes 1000-1999/2000 -> 1000
+    content_range = response.headers.get("Content-Range", "")
+    try:
+        return int(content_range.split(" ", 1)[1].split("-", 1)[0])
+    except (IndexError, ValueError):
+        return None
+
+
+async def _download_attempt(client: httpx.AsyncClient, source_url: str, part_path: Path, sidecar_path: Path,
+                            sidecar: dict, expected_size: int | None):
+    """Un intento de descarga. Continúa desde los bytes ya recibidos si el servidor acepta Range."""
+    received = part_path.stat().st_size if part_path.exists() else 0
+    headers = {"Range": f"bytes={received}-"} if received else {}
+
+    if received and expected_size and received >= expected_size:
+        return # El archivo parcial ya está completo (se cortó antes de renombrarlo)
+
+    # 1. Si tenemos la URL de media resuelta, vamos directo (sin auth de Jira: la URL ya viene firmada)
+    #    Si caducó, volvemos a pasar por la URL de Jira siguiendo la redirección.
+    requests_to_try = []
+    if received and sidecar.get("media_url"):
+        requests_to_try.append((sidecar["media_url"], None))
+    requests_to_try.append((source_url, httpx.USE_CLIENT_DEFAULT))
+
+    for url, auth in requests_to_try:
+        async with client.stream("GET", url, headers=headers, auth=auth, follow_redirects=True,
+                                 timeout=DOWNLOAD_TIMEOUT) as response:
+            if response.status_code in EXPIRED_MEDIA_STATUS and auth is None:
+                continue
+
+            if response.status_code == 416:
+                # Rango no satisfacible: el parcial no es válido, empezamos de cero
+                part_path.unlink(missing_ok=True)
+                raise httpx.HTTPStatusError("Rango no satisfacible", request=response.request, response=response)
+
+            response.raise_for_status()
+
+            if response.status_code == 206 and _range_start(response) != received:
+                # Un 206 que no empieza donde lo pedimos (o sin Content-Range) no se puede añadir
+                # ni guardar como archivo completo: se descarta y el próximo intento va sin Range
+                part_path.unlink(missing_ok=True)
+                raise httpx.HTTPStatusError("Content-Range no coincide con el Range pedido",
+                                            request=response.request, response=response)
+
+            sidecar["media_url"] = str(response.url)
+
+            if response.status_code == 206:
+                mode = 'ab' # El servidor respetó el Range: añadimos al final
+            else:
+                mode = 'wb' # El servidor ignoró el Range (200): descarga completa desde cero
+                received = 0
+
+            # Registramos la URL resuelta antes de empezar, para poder reanudar aunque el corte sea temprano
+            sidecar["received"] = received
+            _save_sidecar(sidecar_path, sidecar)
+
+            with open(part_path, mode) as f:
+                pendiente = 0
+                async for chunk in response.aiter_bytes(CHUNK_SIZE):
+                    f.write(chunk)
+                    received += len(chunk)
+                    pendiente += len(chunk)
+                    if pendiente >= SIDECAR_EVERY:
+                        f.flush()
+                        sidecar["received"] = received
+                        _save_sidecar(sidecar_path, sidecar)
+                        pendiente = 0
+
+            sidecar["received"] = received
+            _save_sidecar(sidecar_path, sidecar)
+            return
+
+
+async def download_resumable(client: httpx.AsyncClient, source_url: str, filepath: Path,
+                             expected_size: int | None = None, max_attempts: int = 4) -> bool:
+    """
+    Descarga 'source_url' en 'filepath' reintentando desde el último byte recibido.
+
+    :param expected_size: Tamaño esperado en bytes (campo 'size' de los metadatos de Jira), si se conoce.
+    :param max_attempts: Número máximo de intentos (con espera exponencial entre ellos).
+    :return: True si el archivo quedó completo en 'filepath', False en caso contrario.
+    """
+    part_path, sidecar_path = _partial_paths(filepath)
+    part_path.parent.mkdir(parents=True, exist_ok=True)
+    sidecar = _load_sidecar(sidecar_path, source_url)
+
+    # Un parcial sin sidecar válido (de otro adjunto con el mismo nombre) no sirve para reanudar
+    if sidecar is None:
+        part_path.unlink(missing_ok=True)
+        sidecar = {"source_url": source_url, "media_url": None, "received": 0}
+
+    for attempt in range(1, max_attempts + 1):
+        try:
+            await _download_attempt(client, source_url, part_path, sidecar_path, sidecar, expected_size)
+
+            size = part_path.stat().st_size
+            if expected_size and size != expected_size:
+                if size > expected_size:
+                    part_path.unlink() # Parcial corrupto: el próximo intento empieza de cero
+                raise httpx.DecodingError(f"Tamaño incompleto: {size} de {expected_size} bytes")
+
+            part_path.replace(filepath)
+            sidecar_path.unlink(missing_ok=True)
+            return True
+
+        except httpx.HTTPError as e:
+            recibido = part_path.stat().st_size if part_path.exists() else 0
+            print(f"   -> Intento {attempt}/{max_attempts} fallido para '{filepath.name}' ({recibido} bytes guardados): {e}")
+            if attempt < max_attempts:
+                await asyncio.sleep(2 ** attempt)
+
+    return False
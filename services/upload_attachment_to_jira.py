@@ -1,15 +1,18 @@
 import os
-import requests
 from pathlib import Path
-from requests.auth import HTTPBasicAuth
 from typing import Union
+import httpx
+
+# La subida puede tardar con archivos grandes: el timeout de escritura es por bloque enviado
+UPLOAD_TIMEOUT = httpx.Timeout(30.0, write=120.0)
 
 def upload_attachment_to_jira(
     file_path: Path, 
     issue_key: str,
     jira_url: str,
     jira_user: str,
-    jira_token: str
+    jira_token: str,
+    mime_type: str = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
 ) -> bool:
     """
     Sube un archivo como adjunto a la incidencia de Jira especificada.
@@ -19,9 +22,10 @@ def upload_attachment_to_jira(
     :param jira_url: URL base de la instancia de Jira (ej: https://tudominio.atlassian.net).
     :param jira_user: Usuario o Email para la autenticación.
     :param jira_token: Token de API para la autenticación.
+    :param mime_type: Tipo MIME del archivo (por defecto XLSX).
     :return: True si la subida fue exitosa, False en caso contrario.
+    :raises httpx.HTTPError: Si falla la conexión con Jira.
     """
-    
     # 1. Validación inicial
     if not file_path.exists():
         print(f"ERROR JIRA UPLOAD: El archivo no existe en la ruta: {file_path}")
@@ -34,7 +38,7 @@ def upload_attachment_to_jira(
     # 2. Configuración de la API
     # URL del endpoint de adjuntos: /rest/api/2/issue/{issueKey}/attachments
     upload_url = f"{jira_url.rstrip('/')}/rest/api/2/issue/{issue_key}/attachments"
-    auth = HTTPBasicAuth(jira_user, jira_token)
+    auth = (jira_user, jira_token) # httpx lo envía como Basic Auth
     
     # 3. Preparación de la solicitud
     # Este header es necesario para uploads de adjuntos en Jira Cloud/Server
@@ -45,18 +49,20 @@ def upload_attachment_to_jira(
     # Abrir el archivo en modo binario
     with open(file_path, 'rb') as f:
         files = {
-            # 'file': (nombre_archivo, contenido_binario, tipo_mime)
-            'file': (file_path.name, f, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+            # 'file': (nombre_archivo, archivo_abierto, tipo_mime)
+            # httpx lee el archivo por bloques al enviar el multipart: no lo carga entero en memoria
+            'file': (file_path.name, f, mime_type)
         }
         
         print(f"Intentando subir el archivo '{file_path.name}' a la incidencia {issue_key}...")
         
         # 4. Envío de la solicitud POST
-        response = requests.post(
+        response = httpx.post(
             upload_url,
             auth=auth,
             files=files,
-            headers=headers
+            headers=headers,
+            timeout=UPLOAD_TIMEOUT
         )
 
     # 5. Manejo de la respuesta
@@ -67,6 +73,6 @@ def upload_attachment_to_jira(
         print(f"  -> UPLOAD FALLIDO: Error {response.status_code} al adjuntar '{file_path.name}'.")
         try:
             print(f"     Respuesta de Jira: {response.json()}")
-        except requests.exceptions.JSONDecodeError:
+        except ValueError: # El cuerpo no es JSON
             print(f"     Respuesta de Jira (Texto): {response.text}")
         return False
\ No newline at end of file